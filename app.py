@@ -2,8 +2,10 @@ import os
 import shutil
 import streamlit as st
 from sqlalchemy.orm import Session
-from utils.file_processing import extract_text_from_pdf
-from utils.grading import grade_assignment
+from utils.file_processing import extract_text_from_pdf, iter_pdf_pages, pdf_page_count
+from utils.grading import grade_assignment, grade_assignment_streaming, STREAMING_PAGE_THRESHOLD, WEIGHT_PROFILES, MODEL_VERSION
+from utils.grading_cache import grading_memo, file_hash
+from utils.lexical import get_lexical_model
 from database import get_db
 from models import Assignment, Result
 from pgc.pgc import check_plagiarism  # Ensure correct import
@@ -128,9 +130,6 @@ elif panel == "Student":
             with open(assignment_pdf_path, "wb") as buffer:
                 shutil.copyfileobj(assignment_pdf, buffer)
 
-            # Extract text from PDF
-            student_text = extract_text_from_pdf(assignment_pdf_path)
-            
             # Get database session
             db: Session = get_database_session()
 
@@ -139,7 +138,6 @@ elif panel == "Student":
             if not assignment:
                 st.error("Assignment ID not found.")
             else:
-                key_text = extract_text_from_pdf(assignment.key_pdf)
                 technical = assignment.technical
                 grammar = assignment.grammar
                 spelling = assignment.spelling
@@ -162,19 +160,37 @@ elif panel == "Student":
                 else:
                     x = 1
 
-                # Grade the assignment
-                marks_obtained = grade_assignment(student_text, key_text, assignment.total_marks, x)
-                percentage = (marks_obtained / assignment.total_marks) * 100
-                
-                # Save the result in the database
-                new_result = Result(
-                    student_id=1,  # Example student ID
-                    assignment_id=assignment_id,
-                    marks_obtained=marks_obtained,
-                    percentage=percentage
-                )
-                db.add(new_result)
-                db.commit()
+                # Reuse the stored result if this exact submission was already graded
+                submission_hash = file_hash(assignment_pdf_path)
+                key_hash = file_hash(assignment.key_pdf)
+                memo_args = (submission_hash, assignment_id, key_hash, WEIGHT_PROFILES[x], MODEL_VERSION)
+                cached = grading_memo.get(*memo_args)
+                if cached is not None:
+                    marks_obtained = cached["marks_obtained"]
+                    percentage = cached["percentage"]
+                else:
+                    # Extract text and grade the assignment; large submissions are streamed page by page
+                    key_text = extract_text_from_pdf(assignment.key_pdf)
+                    lexical_model = get_lexical_model(assignment_id, key_text, key_hash)
+                    if pdf_page_count(assignment_pdf_path) > STREAMING_PAGE_THRESHOLD:
+                        marks_obtained = grade_assignment_streaming(
+                            iter_pdf_pages(assignment_pdf_path), key_text, assignment.total_marks, x, lexical_model
+                        )
+                    else:
+                        student_text = extract_text_from_pdf(assignment_pdf_path)
+                        marks_obtained = grade_assignment(student_text, key_text, assignment.total_marks, x, lexical_model)
+                    percentage = (marks_obtained / assignment.total_marks) * 100
+                    
+                    # Save the result in the database
+                    new_result = Result(
+                        student_id=1,  # Example student ID
+                        assignment_id=assignment_id,
+                        marks_obtained=marks_obtained,
+                        percentage=percentage
+                    )
+                    db.add(new_result)
+                    db.commit()
+                    grading_memo.put(*memo_args, {"marks_obtained": marks_obtained, "percentage": percentage})
 
                 st.success(f"Marks Obtained: {marks_obtained}")
                 st.info(f"Percentage: {percentage:.2f}%")
@@ -9,6 +9,13 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Add a column to an existing table when the database predates it
+def add_missing_column(table, column, definition):
+    with engine.begin() as connection:
+        columns = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if columns and column not in columns:
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -6,3 +6,13 @@ def extract_text_from_pdf(pdf_path):
         for page in pdf:
             text += page.get_text()
     return text.strip()
+
+def iter_pdf_pages(pdf_path):
+    """Yields the text of each page in turn, so only one page is held in memory at a time."""
+    with fitz.open(pdf_path) as pdf:
+        for page in pdf:
+            yield page.get_text()
+
+def pdf_page_count(pdf_path):
+    with fitz.open(pdf_path) as pdf:
+        return pdf.page_count
@@ -1,32 +1,22 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
 from spellchecker import SpellChecker
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import util
 import numpy as np
 from Levenshtein import distance as levenshtein_distance
+import os
 import re
-import spacy
+import time
+from collections import Counter
+from utils.inference import encode, parse, EMBEDDING_MODEL_NAME, NLP_MODEL_NAME
+from utils.lexical import LexicalModel, count_terms
 
-# Load embedding model and NLP model
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-nlp = spacy.load("en_core_web_sm")
+# Embedding and NLP models are owned by the batching inference service in utils.inference
 
+# Identifies the models and scoring logic behind a grade; bump the suffix when the scoring changes
+MODEL_VERSION = f"{EMBEDDING_MODEL_NAME}+{NLP_MODEL_NAME}+v2"
 
-        
-# Cosine Similarity
-def cosine_similarity_score(doc1, doc2):
-    if not doc1 or not doc2:
-        return 0
-    vectorizer = TfidfVectorizer().fit_transform([doc1, doc2])
-    vectors = vectorizer.toarray()
-    cosine_sim = cosine_similarity(vectors)
-    return cosine_sim[0][1]
 
-# Jaccard Similarity
-def jaccard_similarity_score(doc1, doc2):
-    words_doc1 = set(doc1.split())
-    words_doc2 = set(doc2.split())
-    return len(words_doc1.intersection(words_doc2)) / len(words_doc1.union(words_doc2)) if words_doc1 or words_doc2 else 0
+        
+# Cosine, Jaccard and keyword scores are computed by the assignment's LexicalModel in utils.lexical
 
 # Levenshtein Similarity
 def levenshtein_similarity_score(doc1, doc2):
@@ -38,26 +28,9 @@ def levenshtein_similarity_score(doc1, doc2):
 def embedding_similarity_score(doc1, doc2):
     if not doc1 or not doc2:
         return 0
-    embeddings = embedding_model.encode([doc1, doc2])
+    embeddings = encode([doc1, doc2])
     return util.cos_sim(embeddings[0], embeddings[1]).item()
 
-# Extract important keywords from the key text
-def extract_keywords(text):
-    vectorizer = TfidfVectorizer(max_features=10)
-    tfidf_matrix = vectorizer.fit_transform([text])
-    tfidf_terms = vectorizer.get_feature_names_out()
-    doc = nlp(text)
-    entities = {ent.text for ent in doc.ents}
-    keywords = set(tfidf_terms).union(entities)
-    return keywords
-
-# Keyword Matching with Dynamic Keywords
-def keyword_match_score(doc1, doc2):
-    keywords = extract_keywords(doc1)
-    words = set(doc2.split())
-    matches = sum(1 for word in keywords if word in words)
-    return matches / len(keywords) if keywords else 0
-
 # Numeric Consistency Check
 def numeric_consistency_score(doc1, doc2):
     nums_doc1 = set(re.findall(r'\b\d+\b', doc1))
@@ -66,13 +39,14 @@ def numeric_consistency_score(doc1, doc2):
 
 # Named Entity Matching
 def entity_match_score(doc1, doc2):
-    entities_doc1 = {ent.text.lower() for ent in nlp(doc1).ents}
-    entities_doc2 = {ent.text.lower() for ent in nlp(doc2).ents}
+    nlp_doc1, nlp_doc2 = parse([doc1, doc2])
+    entities_doc1 = {ent.text.lower() for ent in nlp_doc1.ents}
+    entities_doc2 = {ent.text.lower() for ent in nlp_doc2.ents}
     return len(entities_doc1.intersection(entities_doc2)) / len(entities_doc1) if entities_doc1 else 1
 
 # Grammar and sentence structure checking (simplified)
 def grammar_error_score(doc_text):
-    doc_nlp = nlp(doc_text)
+    doc_nlp = parse([doc_text])[0]
     sentences = list(doc_nlp.sents)
     error_count = 0
 
@@ -95,149 +69,393 @@ def spelling_error_score(doc_text):
     error_penalty = len(misspelled)
     return 1 - (error_penalty / len(words)) if words else 1, error_penalty
 
-# Update the grading function to include spelling error checking
-def grade_assignment(student_text, key_text, total_marks, x):
-    # Calculate similarity scores
-    cosine_sim = cosine_similarity_score(student_text, key_text)
-    jaccard_sim = jaccard_similarity_score(student_text, key_text)
-    levenshtein_sim = levenshtein_similarity_score(student_text, key_text)
-    embedding_sim = embedding_similarity_score(student_text, key_text)
-    keyword_sim = keyword_match_score(key_text, student_text)
-    numeric_sim = numeric_consistency_score(key_text, student_text)
-    entity_sim = entity_match_score(key_text, student_text)
-    grammar_penalty = grammar_error_score(student_text)
-    spelling_penalty_score, spelling_error_count = spelling_error_score(student_text)  # Get spelling penalty and count
-
-    # Assign weights to each algorithm
-    if x == 1: #Normal
-        cosine_weight = 0.2
-        jaccard_weight = 0.15
-        levenshtein_weight = 0.1
-        embedding_weight = 0.3
-        keyword_weight = 0.05
-        numeric_weight = 0.05
-        entity_weight = 0.05
-        grammar_weight = 0.05
-        spelling_weight = 0.05
-    elif x == 2: #technical
-        cosine_weight = 0.2
-        jaccard_weight = 0.15
-        levenshtein_weight = 0.1
-        embedding_weight = 0.05
-        keyword_weight = 0.4
-        numeric_weight = 0.08
-        entity_weight = 0.01
-        grammar_weight = 0
-        spelling_weight = 0.01       
-    elif x == 3: #grammar
-        cosine_weight = 0.2
-        jaccard_weight = 0.15
-        levenshtein_weight = 0.1
-        embedding_weight = 0.05
-        keyword_weight = 0.05
-        numeric_weight = 0.01
-        entity_weight = 0.01
-        grammar_weight = 0.42
-        spelling_weight = 0.01
-    elif x == 4: #spelling
-        cosine_weight = 0.2
-        jaccard_weight = 0.15
-        levenshtein_weight = 0.1
-        embedding_weight = 0.05
-        keyword_weight = 0.05
-        numeric_weight = 0.01
-        entity_weight = 0.01
-        grammar_weight = 0.01
-        spelling_weight = 0.42       
-    elif x == 5: #tech and grammar
-        cosine_weight = 0.2
-        jaccard_weight = 0.15
-        levenshtein_weight = 0.1
-        embedding_weight = 0.05
-        keyword_weight = 0.20
-        numeric_weight = 0.05
-        entity_weight = 0.01
-        grammar_weight = 0.23
-        spelling_weight = 0.01      
-    elif x == 6: #tech and spelling
-        cosine_weight = 0.2
-        jaccard_weight = 0.15
-        levenshtein_weight = 0.1
-        embedding_weight = 0.05
-        keyword_weight = 0.22
-        numeric_weight = 0.05
-        entity_weight = 0.01
-        grammar_weight = 0.01
-        spelling_weight = 0.22  
-        #1.02
-    elif x == 7: #spelling and grammar
-        cosine_weight = 0.2
-        jaccard_weight = 0.15
-        levenshtein_weight = 0.1
-        embedding_weight = 0.05
-        keyword_weight = 0.05
-        numeric_weight = 0.01
-        entity_weight = 0.01
-        grammar_weight = 0.23
-        spelling_weight = 0.20  
-    elif x == 8: #tech and grammar and spelling
-        cosine_weight = 0.2
-        jaccard_weight = 0.15
-        levenshtein_weight = 0.1
-        embedding_weight = 0.05
-        keyword_weight = 0.15
-        numeric_weight = 0.04
-        entity_weight = 0.01
-        grammar_weight = 0.15
-        spelling_weight = 0.15
+# Weight profiles for each assignment type, indexed by x
+WEIGHT_PROFILES = {
+    1: {  # Normal
+        "cosine": 0.2,
+        "jaccard": 0.15,
+        "levenshtein": 0.1,
+        "embedding": 0.3,
+        "keyword": 0.05,
+        "numeric": 0.05,
+        "entity": 0.05,
+        "grammar": 0.05,
+        "spelling": 0.05,
+    },
+    2: {  # technical
+        "cosine": 0.2,
+        "jaccard": 0.15,
+        "levenshtein": 0.1,
+        "embedding": 0.05,
+        "keyword": 0.4,
+        "numeric": 0.08,
+        "entity": 0.01,
+        "grammar": 0,
+        "spelling": 0.01,
+    },
+    3: {  # grammar
+        "cosine": 0.2,
+        "jaccard": 0.15,
+        "levenshtein": 0.1,
+        "embedding": 0.05,
+        "keyword": 0.05,
+        "numeric": 0.01,
+        "entity": 0.01,
+        "grammar": 0.42,
+        "spelling": 0.01,
+    },
+    4: {  # spelling
+        "cosine": 0.2,
+        "jaccard": 0.15,
+        "levenshtein": 0.1,
+        "embedding": 0.05,
+        "keyword": 0.05,
+        "numeric": 0.01,
+        "entity": 0.01,
+        "grammar": 0.01,
+        "spelling": 0.42,
+    },
+    5: {  # tech and grammar
+        "cosine": 0.2,
+        "jaccard": 0.15,
+        "levenshtein": 0.1,
+        "embedding": 0.05,
+        "keyword": 0.20,
+        "numeric": 0.05,
+        "entity": 0.01,
+        "grammar": 0.23,
+        "spelling": 0.01,
+    },
+    6: {  # tech and spelling
+        "cosine": 0.2,
+        "jaccard": 0.15,
+        "levenshtein": 0.1,
+        "embedding": 0.05,
+        "keyword": 0.22,
+        "numeric": 0.05,
+        "entity": 0.01,
+        "grammar": 0.01,
+        "spelling": 0.22,
+    },
+    7: {  # spelling and grammar
+        "cosine": 0.2,
+        "jaccard": 0.15,
+        "levenshtein": 0.1,
+        "embedding": 0.05,
+        "keyword": 0.05,
+        "numeric": 0.01,
+        "entity": 0.01,
+        "grammar": 0.23,
+        "spelling": 0.20,
+    },
+    8: {  # tech and grammar and spelling
+        "cosine": 0.2,
+        "jaccard": 0.15,
+        "levenshtein": 0.1,
+        "embedding": 0.05,
+        "keyword": 0.15,
+        "numeric": 0.04,
+        "entity": 0.01,
+        "grammar": 0.15,
+        "spelling": 0.15,
+    },
+}
+
+# Metrics that only contribute marks (grammar and spelling scale or penalise them instead)
+SIMILARITY_METRICS = ["cosine", "jaccard", "levenshtein", "embedding", "keyword", "numeric", "entity"]
+
+# Cheap metrics, always evaluated first; cosine comes with Jaccard and keyword from the lexical model
+CHEAP_METRICS = ["lexical", "numeric", "spelling"]
+
+# Expensive metrics, evaluated while the time budget allows in order of their weight in the profile
+EXPENSIVE_METRICS = ["embedding", "entity", "grammar", "levenshtein"]
+
+# Running estimate of each metric's cost in seconds per unit of input size (see metric_size)
+metric_costs = {}
+
+
+# Function to measure the input size a metric's cost scales with
+def metric_size(name, student_text, key_text):
+    """
+    Returns the number of character pairs for Levenshtein, which is quadratic, and the number of
+    characters for every other metric.
+    """
+    if name == "levenshtein":
+        return len(student_text) * len(key_text)
+    return len(student_text) + len(key_text)
+
+
+# Function to evaluate one metric group
+def evaluate_metric(name, student_text, key_text, lexical_model):
+    """
+    Runs a metric and returns a dictionary of the scores it produces.
+    """
+    if name == "lexical":
+        cosine_sim, jaccard_sim, keyword_sim = lexical_model.score_text(student_text)
+        return {"cosine": cosine_sim, "jaccard": jaccard_sim, "keyword": keyword_sim}
+    if name == "numeric":
+        return {"numeric": numeric_consistency_score(key_text, student_text)}
+    if name == "spelling":
+        spelling_penalty_score, spelling_error_count = spelling_error_score(student_text)
+        return {"spelling": spelling_penalty_score, "spelling_errors": spelling_error_count}
+    if name == "embedding":
+        return {"embedding": embedding_similarity_score(student_text, key_text)}
+    if name == "entity":
+        return {"entity": entity_match_score(key_text, student_text)}
+    if name == "grammar":
+        return {"grammar": grammar_error_score(student_text)}
+    if name == "levenshtein":
+        return {"levenshtein": levenshtein_similarity_score(student_text, key_text)}
+    raise ValueError(f"Unknown metric: {name}")
+
+
+# Function to evaluate metrics within an optional deadline
+def compute_metrics(student_text, key_text, x, lexical_model, deadline=None, scores=None):
+    """
+    Evaluates the cheap metrics, then the expensive ones by weight, skipping any expensive metric
+    whose estimated cost would overrun the deadline (a time.monotonic() value).
+    Metrics already present in scores are not recomputed.
+    Returns (scores, skipped metric names).
+    """
+    scores = dict(scores or {})
+    weights = WEIGHT_PROFILES[x]
+    expensive = sorted(EXPENSIVE_METRICS, key=lambda name: weights[name], reverse=True)
+    skipped = []
+
+    for name in CHEAP_METRICS + expensive:
+        if (name == "lexical" and "cosine" in scores) or name in scores:
+            continue
+        size = metric_size(name, student_text, key_text)
+        if deadline is not None and name in expensive:
+            estimate = metric_costs.get(name, 0) * size
+            if time.monotonic() + estimate > deadline:
+                skipped.append(name)
+                continue
+        start = time.monotonic()
+        scores.update(evaluate_metric(name, student_text, key_text, lexical_model))
+        if size:
+            cost = (time.monotonic() - start) / size
+            metric_costs[name] = 0.8 * metric_costs[name] + 0.2 * cost if name in metric_costs else cost
+
+    return scores, skipped
+
+
+# Function to turn metric scores into marks
+def combine_scores(scores, total_marks, x):
+    """
+    Weights the metric scores into a final mark. Missing similarity metrics are covered by scaling
+    the ones present up to the full similarity weight; a missing grammar score applies no penalty.
+    Returns (final score, weighted marks per metric).
+    """
+    weights = WEIGHT_PROFILES[x]
+    spelling_penalty_score = scores.get("spelling", 1)
+
+    present = [name for name in SIMILARITY_METRICS if name in scores]
+    present_weight = sum(weights[name] for name in present)
+    scale = sum(weights[name] for name in SIMILARITY_METRICS) / present_weight if present_weight else 0
 
     # Calculate individual weighted scores for each algorithm
-    cosine_marks = cosine_sim * cosine_weight * total_marks * spelling_penalty_score
-    jaccard_marks = jaccard_sim * jaccard_weight * total_marks * spelling_penalty_score
-    levenshtein_marks = levenshtein_sim * levenshtein_weight * total_marks * spelling_penalty_score
-    embedding_marks = embedding_sim * embedding_weight * total_marks * spelling_penalty_score
-    keyword_marks = keyword_sim * keyword_weight * total_marks * spelling_penalty_score
-    numeric_marks = numeric_sim * numeric_weight * total_marks * spelling_penalty_score
-    entity_marks = entity_sim * entity_weight * total_marks * spelling_penalty_score
-    penalty_marks = grammar_weight * total_marks * (1 - grammar_penalty)  # Grammar penalty
+    marks = {
+        name: scores[name] * weights[name] * total_marks * spelling_penalty_score * scale
+        for name in present
+    }
+    marks["grammar"] = weights["grammar"] * total_marks * (1 - scores.get("grammar", 1))  # Grammar penalty
 
     # Sum up the weighted scores to get the final score
-    final_score = (
-        cosine_marks + 
-        jaccard_marks + 
-        levenshtein_marks + 
-        embedding_marks + 
-        keyword_marks + 
-        numeric_marks + 
-        entity_marks - penalty_marks + 5
-    )
-
-    #check_plagiarism_tfidf(file_texts)
+    final_score = sum(marks[name] for name in present) - marks["grammar"] + 5
 
     # Ensure the final score does not exceed total marks
-    final_score = min(round(final_score), total_marks)
-    # plagiarism flag = kuhan_func(uploads/)
-    percentage = (final_score / total_marks) * 100
+    return min(round(final_score), total_marks), marks
+
+
+# Function to grade within a time budget
+def grade_assignment_progressive(student_text, key_text, total_marks, x, lexical_model=None, deadline=None):
+    """
+    Grades as many metrics as fit before the deadline (a time.monotonic() value).
+    Returns a dictionary with the marks, the metric scores computed so far, the skipped metrics
+    and a provisional flag that is set when anything was skipped.
+    """
+    if lexical_model is None:
+        lexical_model = LexicalModel(key_text)
+    scores, skipped = compute_metrics(student_text, key_text, x, lexical_model, deadline)
+    final_score, _ = combine_scores(scores, total_marks, x)
+    return {
+        "marks_obtained": final_score,
+        "scores": scores,
+        "skipped": skipped,
+        "provisional": bool(skipped),
+    }
+
+
+# Function to finish a provisional grade
+def finalize_grade(scores, student_text, key_text, total_marks, x, lexical_model):
+    """
+    Computes the metrics missing from a provisional grade and returns the final score.
+    """
+    scores, _ = compute_metrics(student_text, key_text, x, lexical_model, scores=scores)
+    final_score, _ = combine_scores(scores, total_marks, x)
+    return final_score
 
-    # #Test cases
-    # if(x == 8):
-    #     technical = True
-    #     grammar = True
-    #     spelling = True
-    # elif(technical and not grammar and not spelling):
-    #     x = 2
-    # elif(grammar and not technical and not spelling):
-    #     x = 3
-    # elif(spelling and not technical and not grammar):
-    #     x = 4
-    # elif(technical and grammar and not spelling):
-    #     x = 5
-    # elif(technical and spelling and not grammar):
-    #     x = 6
-    # elif(grammar and spelling and not technical):
-    #     x = 7
-    # else:
-    #     x = 1
+
+# Submissions with more pages than this are graded page by page with bounded memory
+STREAMING_PAGE_THRESHOLD = int(os.environ.get("STREAMING_PAGE_THRESHOLD", 20))
+
+# Submissions are streamed in chunks of roughly this many characters
+STREAMING_CHUNK_CHARS = 20000
+
+# Streaming Levenshtein compares aligned windows of this many characters
+LEVENSHTEIN_WINDOW_CHARS = 2000
+
+# all-MiniLM-L6-v2 truncates its input at 256 word pieces (roughly 1000 characters of English),
+# so streaming embeddings are computed over windows short enough to be encoded in full
+EMBEDDING_WINDOW_CHARS = 800
+
+
+# Function to regroup pages into word-aligned chunks
+def iter_chunks(pages, chunk_chars=STREAMING_CHUNK_CHARS):
+    """
+    Yields text chunks of about chunk_chars characters from an iterable of page texts.
+    Chunks end on whitespace so no word or number is split between two chunks.
+    """
+    buffer = ""
+    for page in pages:
+        buffer += page
+        while len(buffer) >= chunk_chars:
+            cut = max(buffer.rfind(" ", 0, chunk_chars), buffer.rfind("\n", 0, chunk_chars))
+            if cut <= 0:
+                cut = chunk_chars
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+    if buffer.strip():
+        yield buffer
+
+
+class StreamingMetrics:
+    """
+    Incremental accumulators for every metric, fed one chunk of the submission at a time.
+    Memory is bounded by the chunk size and the submission's vocabulary, not its length.
+    """
+
+    def __init__(self, key_text, lexical_model):
+        self.key_text = key_text
+        self.lexical_model = lexical_model
+        self.key_numbers = set(re.findall(r'\b\d+\b', key_text))
+        self.key_entities = {ent.text.lower() for ent in parse([key_text])[0].ents}
+        self.key_embedding_sum, self.key_embedding_weight = self._embed_windows(key_text)
+
+        self.term_counts = Counter()
+        self.numbers = set()
+        self.entities = set()
+        self.sentences = 0
+        self.sentence_errors = 0
+        self.words = 0
+        self.misspelled = set()
+        self.embedding_sum = None
+        self.embedding_weight = 0
+        self.length = 0
+        self.edit_distance = 0
+
+    def _embed_windows(self, text):
+        # Returns the length-weighted sum of the text's window embeddings and the total length
+        windows = [window for window in iter_chunks([text], EMBEDDING_WINDOW_CHARS) if window.strip()]
+        if not windows:
+            return None, 0
+        total = None
+        for window, embedding in zip(windows, encode(windows)):
+            weighted = np.asarray(embedding, dtype=np.float32) * len(window)
+            total = weighted if total is None else total + weighted
+        return total, sum(len(window) for window in windows)
+
+    def update(self, chunk):
+        """Adds one chunk of the submission to every accumulator."""
+        self.term_counts.update(count_terms(chunk))
+        self.numbers.update(re.findall(r'\b\d+\b', chunk))
+
+        # Entities and sentence structure come from the same parse
+        doc = parse([chunk])[0]
+        self.entities.update(ent.text.lower() for ent in doc.ents)
+        for sent in doc.sents:
+            self.sentences += 1
+            if not any(token.dep_ == 'nsubj' for token in sent) or not any(token.dep_ == 'ROOT' for token in sent):
+                self.sentence_errors += 1
+
+        words = re.findall(r'\b\w+\b', chunk)
+        self.words += len(words)
+        self.misspelled.update(spell.unknown(words))
+
+        # Embed the chunk in windows the model encodes in full, weighted by their length
+        embedding_sum, embedding_weight = self._embed_windows(chunk)
+        if embedding_sum is not None:
+            self.embedding_sum = embedding_sum if self.embedding_sum is None else self.embedding_sum + embedding_sum
+            self.embedding_weight += embedding_weight
+
+        # Edit distance against the key text at the same offset, in windows to keep the cost linear
+        for start in range(0, len(chunk), LEVENSHTEIN_WINDOW_CHARS):
+            piece = chunk[start:start + LEVENSHTEIN_WINDOW_CHARS]
+            offset = self.length + start
+            self.edit_distance += levenshtein_distance(piece, self.key_text[offset:offset + len(piece)])
+        self.length += len(chunk)
+
+    def scores(self):
+        """Returns the metric scores in the same form as compute_metrics."""
+        cosine_sim, jaccard_sim, keyword_sim = self.lexical_model.scores(self.term_counts)
+
+        if self.length and self.key_text:
+            # Key text beyond the end of the submission counts as deletions
+            distance = self.edit_distance + max(0, len(self.key_text) - self.length)
+            levenshtein_sim = 1 - (distance / max(self.length, len(self.key_text)))
+        else:
+            levenshtein_sim = 0
+
+        if self.embedding_weight and self.key_embedding_weight:
+            pooled = self.embedding_sum / self.embedding_weight
+            key_pooled = self.key_embedding_sum / self.key_embedding_weight
+            embedding_sim = util.cos_sim(pooled, key_pooled).item()
+        else:
+            embedding_sim = 0
+
+        return {
+            "cosine": cosine_sim,
+            "jaccard": jaccard_sim,
+            "keyword": keyword_sim,
+            "levenshtein": levenshtein_sim,
+            "embedding": embedding_sim,
+            "numeric": len(self.key_numbers & self.numbers) / len(self.key_numbers) if self.key_numbers else 1,
+            "entity": len(self.key_entities & self.entities) / len(self.key_entities) if self.key_entities else 1,
+            "grammar": 1 - (self.sentence_errors / self.sentences) if self.sentences else 1,
+            "spelling": 1 - (len(self.misspelled) / self.words) if self.words else 1,
+            "spelling_errors": len(self.misspelled),
+        }
+
+
+# Function to grade a submission chunk by chunk
+def grade_assignment_streaming(pages, key_text, total_marks, x, lexical_model=None):
+    """
+    Grades a submission given as an iterable of page texts without holding the whole text in memory.
+    Levenshtein is summed over windows aligned with the key, and the embedding is a length-weighted
+    mean over windows short enough for the model to encode in full (for the key as well), so both
+    approximate rather than reproduce the whole-document scores.
+    """
+    if lexical_model is None:
+        lexical_model = LexicalModel(key_text)
+    metrics = StreamingMetrics(key_text, lexical_model)
+    for chunk in iter_chunks(pages):
+        metrics.update(chunk)
+    final_score, _ = combine_scores(metrics.scores(), total_marks, x)
+    return final_score
+
+
+# Update the grading function to include spelling error checking
+def grade_assignment(student_text, key_text, total_marks, x, lexical_model=None):
+    # Cosine, Jaccard and keyword scores share one tokenization through the assignment's lexical model
+    if lexical_model is None:
+        lexical_model = LexicalModel(key_text)
+
+    # Calculate every metric, then the weighted marks
+    scores, _ = compute_metrics(student_text, key_text, x, lexical_model)
+    final_score, marks = combine_scores(scores, total_marks, x)
+    weights = WEIGHT_PROFILES[x]
+    percentage = (final_score / total_marks) * 100
 
 # PDF Generation:
 # TITLE: GRADESHEET FOR SUBJECTIVE ASSIGNMENTS
@@ -250,32 +468,28 @@ def grade_assignment(student_text, key_text, total_marks, x):
 # 7. Plagiarism flag = True/False
 
 
-
-    check_plagiarism(file_texts)
-
-
     # Print the contribution of each algorithm
     print("\nRaw marks assigned by each algorithm:")
-    print(f"Cosine Similarity: {cosine_sim:.2f}")
-    print(f"Jaccard Similarity: {jaccard_sim:.2f}")
-    print(f"Levenshtein Similarity: {levenshtein_sim:.2f}")
-    print(f"Embedding Similarity: {embedding_sim:.2f}")
-    print(f"Keyword Matching: {keyword_sim:.2f}")
-    print(f"Numeric Consistency: {numeric_sim:.2f}")
-    print(f"Entity Matching: {entity_sim:.2f}")
-    print(f"Grammar Penalty Score: {penalty_marks:.2f}")
-    print(f"Spelling Error Penalty Count: {spelling_error_count}")  # Print spelling penalty count
+    print(f"Cosine Similarity: {scores['cosine']:.2f}")
+    print(f"Jaccard Similarity: {scores['jaccard']:.2f}")
+    print(f"Levenshtein Similarity: {scores['levenshtein']:.2f}")
+    print(f"Embedding Similarity: {scores['embedding']:.2f}")
+    print(f"Keyword Matching: {scores['keyword']:.2f}")
+    print(f"Numeric Consistency: {scores['numeric']:.2f}")
+    print(f"Entity Matching: {scores['entity']:.2f}")
+    print(f"Grammar Penalty Score: {marks['grammar']:.2f}")
+    print(f"Spelling Error Penalty Count: {scores['spelling_errors']}")  # Print spelling penalty count
 
     # Print the weighted contributions
     print("\n\nMarks assigned by each algorithm (weighted):")
-    print(f"Cosine Similarity: {cosine_marks:.2f} out of {total_marks * cosine_weight:.2f}")
-    print(f"Jaccard Similarity: {jaccard_marks:.2f} out of {total_marks * jaccard_weight:.2f}")
-    print(f"Levenshtein Similarity: {levenshtein_marks:.2f} out of {total_marks * levenshtein_weight:.2f}")
-    print(f"Embedding Similarity: {embedding_marks:.2f} out of {total_marks * embedding_weight:.2f}")
-    print(f"Keyword Matching: {keyword_marks:.2f} out of {total_marks * keyword_weight:.2f}")
-    print(f"Numeric Consistency: {numeric_marks:.2f} out of {total_marks * numeric_weight:.2f}")
-    print(f"Entity Matching: {entity_marks:.2f} out of {total_marks * entity_weight:.2f}")
-    print(f"Grammar Penalty: -{penalty_marks:.2f} out of {total_marks * grammar_weight:.2f}")
+    print(f"Cosine Similarity: {marks['cosine']:.2f} out of {total_marks * weights['cosine']:.2f}")
+    print(f"Jaccard Similarity: {marks['jaccard']:.2f} out of {total_marks * weights['jaccard']:.2f}")
+    print(f"Levenshtein Similarity: {marks['levenshtein']:.2f} out of {total_marks * weights['levenshtein']:.2f}")
+    print(f"Embedding Similarity: {marks['embedding']:.2f} out of {total_marks * weights['embedding']:.2f}")
+    print(f"Keyword Matching: {marks['keyword']:.2f} out of {total_marks * weights['keyword']:.2f}")
+    print(f"Numeric Consistency: {marks['numeric']:.2f} out of {total_marks * weights['numeric']:.2f}")
+    print(f"Entity Matching: {marks['entity']:.2f} out of {total_marks * weights['entity']:.2f}")
+    print(f"Grammar Penalty: -{marks['grammar']:.2f} out of {total_marks * weights['grammar']:.2f}")
 
     print(f"\nMarks Obtained: {final_score:.2f} out of {total_marks:.2f}")
     print(f"\nPercentage: {percentage:.2f} out of 100\n\n")
@@ -284,4 +498,4 @@ def grade_assignment(student_text, key_text, total_marks, x):
 
     
 
-# pip freeze > requirements.txt
\ No newline at end of file
+# pip freeze > requirements.txt
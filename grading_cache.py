@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Maximum number of grading results kept in memory per worker
+MEMO_MAX_ENTRIES = int(os.environ.get("GRADING_MEMO_MAX_ENTRIES", 1024))
+
+# File hashes keyed by (path, size, mtime) so unchanged key PDFs are not re-read on every submission
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+
+# Function to hash a file's contents
+def file_hash(path):
+    """
+    Returns the SHA-256 hex digest of the file at path. Reuses the previous digest while
+    the file's size and modification time are unchanged.
+    """
+    stat = os.stat(path)
+    signature = (path, stat.st_size, stat.st_mtime_ns)
+    with _file_hashes_lock:
+        if signature in _file_hashes:
+            return _file_hashes[signature]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    with _file_hashes_lock:
+        if len(_file_hashes) >= MEMO_MAX_ENTRIES:
+            _file_hashes.clear()
+        _file_hashes[signature] = digest.hexdigest()
+    return digest.hexdigest()
+
+
+# Function to hash a weight profile
+def weights_hash(weights):
+    """
+    Returns a stable digest of a weight profile dictionary.
+    """
+    return hashlib.sha256(json.dumps(weights, sort_keys=True).encode()).hexdigest()
+
+
+class GradingMemo:
+    """
+    Size-bounded LRU of grading results keyed by
+    (submission hash, assignment ID, key hash, weight profile, model version).
+    Entries for an assignment are dropped as soon as it is seen with a different key, weights or model.
+    """
+
+    def __init__(self, max_entries=MEMO_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.assignment_profiles = {}
+        self.lock = threading.Lock()
+
+    def _profile(self, key_hash, weights, model_version):
+        return (key_hash, weights_hash(weights), model_version)
+
+    def _check_profile(self, assignment_id, profile):
+        # Called with the lock held: invalidate stale entries when the key, weights or model change
+        if self.assignment_profiles.get(assignment_id) != profile:
+            self._invalidate_locked(assignment_id)
+            self.assignment_profiles[assignment_id] = profile
+
+    def get(self, submission_hash, assignment_id, key_hash, weights, model_version):
+        """Returns the stored result for the submission, or None."""
+        profile = self._profile(key_hash, weights, model_version)
+        with self.lock:
+            self._check_profile(assignment_id, profile)
+            entry_key = (submission_hash, assignment_id) + profile
+            result = self.entries.get(entry_key)
+            if result is not None:
+                self.entries.move_to_end(entry_key)
+            return result
+
+    def put(self, submission_hash, assignment_id, key_hash, weights, model_version, result):
+        """Stores a grading result, evicting the least recently used entries beyond max_entries."""
+        profile = self._profile(key_hash, weights, model_version)
+        with self.lock:
+            self._check_profile(assignment_id, profile)
+            self.entries[(submission_hash, assignment_id) + profile] = result
+            self.entries.move_to_end((submission_hash, assignment_id) + profile)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, assignment_id):
+        """Drops every stored result for an assignment."""
+        with self.lock:
+            self._invalidate_locked(assignment_id)
+            self.assignment_profiles.pop(assignment_id, None)
+
+    def _invalidate_locked(self, assignment_id):
+        for entry_key in [k for k in self.entries if k[1] == assignment_id]:
+            del self.entries[entry_key]
+
+
+# Shared memo used by the grading endpoints
+grading_memo = GradingMemo()
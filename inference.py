@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from sentence_transformers import SentenceTransformer
+import spacy
+
+# Micro-batching limits: a batch is dispatched once it holds MAX_BATCH_SIZE texts
+# or MAX_WAIT_MS milliseconds after its first text arrived, whichever comes first.
+MAX_BATCH_SIZE = int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", 32))
+MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", 10))
+
+# The inference service owns the embedding and NLP models
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+NLP_MODEL_NAME = "en_core_web_sm"
+embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+nlp = spacy.load(NLP_MODEL_NAME)
+
+
+class MicroBatcher:
+    """
+    Collects texts submitted by concurrent callers and runs them through batch_fn together.
+    batch_fn takes a list of texts and returns one result per text, in order.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, name="micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self.worker.start()
+
+    def submit(self, texts):
+        """Queues the texts and returns one future per text."""
+        futures = []
+        for text in texts:
+            future = Future()
+            self.requests.put((text, future))
+            futures.append(future)
+        return futures
+
+    def __call__(self, texts):
+        """Blocks until every text has been processed and returns the results in order."""
+        return [future.result() for future in self.submit(texts)]
+
+    def _collect_batch(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.requests.get(timeout=remaining))
+                else:
+                    batch.append(self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_one(self, text, future):
+        # Runs a single text so a failure only reaches the caller that submitted it
+        try:
+            results = self.batch_fn([text])
+            if len(results) != 1:
+                raise RuntimeError(f"batch_fn returned {len(results)} results for 1 text")
+            future.set_result(results[0])
+        except Exception as e:
+            future.set_exception(e)
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _ in batch]
+            try:
+                results = list(self.batch_fn(texts))
+            except Exception:
+                # One bad text must not fail everyone else's request: retry each text on its own
+                for text, future in batch:
+                    self._run_one(text, future)
+                continue
+            if len(results) != len(batch):
+                error = RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} texts")
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+_encoder = MicroBatcher(
+    lambda texts: list(embedding_model.encode(texts, batch_size=MAX_BATCH_SIZE)),
+    name="embedding-batcher",
+)
+_parser = MicroBatcher(
+    lambda texts: list(nlp.pipe(texts, batch_size=MAX_BATCH_SIZE)),
+    name="spacy-batcher",
+)
+
+
+# Function to compute sentence embeddings through the shared batcher
+def encode(texts):
+    """
+    Returns one embedding per text. Calls from concurrent grading requests are batched together.
+    """
+    return _encoder(texts)
+
+
+# Function to parse texts with spaCy through the shared batcher
+def parse(texts):
+    """
+    Returns one spaCy Doc per text. Calls from concurrent grading requests are batched together.
+    """
+    return _parser(texts)
@@ -0,0 +1,111 @@
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from utils.inference import parse
+
+# Same token rule as TfidfVectorizer's default: words of two or more characters, lowercased
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+# Number of most frequent key terms used as keywords
+KEYWORD_COUNT = 10
+
+# Smoothed idf (TfidfVectorizer's default) for a term found in both or only one of key and submission
+SHARED_TERM_IDF = math.log(3 / 3) + 1
+UNSHARED_TERM_IDF = math.log(3 / 2) + 1
+
+# Maximum number of assignments whose fitted models are kept in memory
+LEXICAL_MODEL_MAX_ASSIGNMENTS = int(os.environ.get("LEXICAL_MODEL_MAX_ASSIGNMENTS", 128))
+
+
+# Function to tokenize text once for every lexical metric
+def count_terms(text):
+    """
+    Returns a Counter of the text's lowercased tokens.
+    """
+    return Counter(TOKEN_PATTERN.findall(text.lower()))
+
+
+class LexicalModel:
+    """
+    Lexical model for one assignment, fitted once on the key text.
+    Each submission is tokenized once into sparse term counts, which are used for the cosine,
+    Jaccard and keyword metrics. The model is not modified by scoring, so a submission's scores
+    depend only on its own text and the key.
+    """
+
+    def __init__(self, key_text):
+        self.key_counts = count_terms(key_text)
+
+        # Keywords: the most frequent key terms plus the key's named entities, as token tuples
+        top_terms = sorted(self.key_counts.items(), key=lambda item: (-item[1], item[0]))[:KEYWORD_COUNT]
+        self.keywords = {(term,) for term, _ in top_terms}
+        for ent in parse([key_text])[0].ents:
+            tokens = tuple(TOKEN_PATTERN.findall(ent.text.lower()))
+            if tokens:
+                self.keywords.add(tokens)
+
+    def _tfidf(self, counts, other_counts):
+        # IDF over the two-document corpus {key, submission}, as the original per-pair TfidfVectorizer fit
+        vector = {
+            term: count * (SHARED_TERM_IDF if term in other_counts else UNSHARED_TERM_IDF)
+            for term, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return vector, norm
+
+    def scores(self, counts):
+        """
+        Returns (cosine, jaccard, keyword) scores of a submission's term counts against the key.
+        """
+        if not counts or not self.key_counts:
+            cosine = 0
+        else:
+            student_vector, student_norm = self._tfidf(counts, self.key_counts)
+            key_vector, key_norm = self._tfidf(self.key_counts, counts)
+            dot = sum(weight * key_vector.get(term, 0) for term, weight in student_vector.items())
+            cosine = dot / (student_norm * key_norm) if student_norm and key_norm else 0
+
+        student_terms = counts.keys()
+        key_terms = self.key_counts.keys()
+        union = len(student_terms | key_terms)
+        jaccard = len(student_terms & key_terms) / union if union else 0
+
+        matches = sum(1 for keyword in self.keywords if all(token in counts for token in keyword))
+        keyword = matches / len(self.keywords) if self.keywords else 0
+        return cosine, jaccard, keyword
+
+    def score_text(self, text):
+        """
+        Tokenizes a submission once and returns its (cosine, jaccard, keyword) scores.
+        """
+        return self.scores(count_terms(text))
+
+
+# Fitted models keyed by assignment ID, holding (key hash, model)
+_models = OrderedDict()
+_models_lock = threading.Lock()
+
+
+# Function to get the fitted lexical model for an assignment
+def get_lexical_model(assignment_id, key_text, key_hash=None):
+    """
+    Returns the assignment's lexical model, fitting a new one if none exists or the key changed.
+    """
+    if key_hash is None:
+        key_hash = hashlib.sha256(key_text.encode()).hexdigest()
+    with _models_lock:
+        cached = _models.get(assignment_id)
+        if cached is not None and cached[0] == key_hash:
+            _models.move_to_end(assignment_id)
+            return cached[1]
+
+    model = LexicalModel(key_text)
+    with _models_lock:
+        _models[assignment_id] = (key_hash, model)
+        _models.move_to_end(assignment_id)
+        while len(_models) > LEXICAL_MODEL_MAX_ASSIGNMENTS:
+            _models.popitem(last=False)
+    return model
@@ -0,0 +1,417 @@
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import fitz  # PyMuPDF for generating synthetic PDF files
+
+# Share of requests sent to each endpoint unless overridden with --mix
+DEFAULT_MIX = {
+    "submit_assignment": 0.80,
+    "check_plagiarism": 0.15,
+    "create_assignment": 0.05,
+}
+
+ENDPOINT_PATHS = {
+    "submit_assignment": "/student/submit_assignment",
+    "create_assignment": "/professor/create_assignment",
+    "check_plagiarism": "/professor/check_plagiarism",
+}
+
+WORDS = (
+    "the process of photosynthesis converts light energy into chemical energy stored in glucose "
+    "plants absorb carbon dioxide and water releasing oxygen as a by product chlorophyll in the "
+    "chloroplast captures sunlight during the light dependent reactions while the calvin cycle "
+    "fixes carbon in 1961 melvin calvin received the nobel prize for this work about 170 billion "
+    "tonnes of carbon are fixed each year an efficient answer explains each stage clearly"
+).split()
+
+
+# Function to generate synthetic answer text
+def synthetic_text(rng, words=300):
+    """
+    Returns pseudo-random prose built from a fixed vocabulary, split into sentences.
+    """
+    sentences = []
+    remaining = words
+    while remaining > 0:
+        length = min(remaining, rng.randint(8, 20))
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+
+# Function to render text into a PDF
+def synthetic_pdf(text):
+    """
+    Returns the bytes of a PDF containing the text, spread over as many pages as needed.
+    """
+    doc = fitz.open()
+    chunk_size = 2500  # Roughly one page of 11pt text
+    for start in range(0, len(text), chunk_size):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), text[start:start + chunk_size], fontsize=11)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+# Function to encode a multipart/form-data request body
+def encode_multipart(fields=None, files=None, boundary=None):
+    """
+    Encodes form fields and (field name, file name, bytes) files. Returns (body, content type).
+    """
+    boundary = boundary or uuid.uuid4().hex
+    parts = []
+    for name, value in (fields or {}).items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, filename, data in files or []:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: application/pdf\r\n\r\n".encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+# Function to read the resident set size of a process tree
+def process_tree_rss_mb(pid):
+    """
+    Returns the combined resident set size in MB of a process and all its descendants
+    (e.g. a uvicorn master and its workers), read from /proc. Returns None if pid is not running.
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The parent pid is the second field after the parenthesised command name
+                parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    total_kb = None
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total_kb = (total_kb or 0) + int(line.split()[1])
+                        break
+        except OSError:
+            continue
+        pending.extend(children.get(current, []))
+    return total_kb / 1024 if total_kb is not None else None
+
+
+# Function to compute a percentile
+def percentile(sorted_values, fraction):
+    """
+    Returns the nearest-rank percentile of an already sorted list, or None if it is empty.
+    """
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class LoadTest:
+    """
+    Replays request schedules against the grading API and records latency, errors and
+    the server's peak memory. A mixed-traffic phase is followed by one phase per endpoint,
+    so each endpoint's peak memory is measured on its own.
+    """
+
+    def __init__(self, base_url, mix, requests, phase_requests, concurrency, words, seed, server_pid=None,
+                 repeat_submissions=False):
+        self.base_url = base_url.rstrip("/")
+        self.mix = mix
+        self.requests = requests
+        self.phase_requests = phase_requests
+        self.concurrency = concurrency
+        self.words = words
+        self.rng = random.Random(seed)
+        self.server_pid = server_pid
+        self.repeat_submissions = repeat_submissions
+        self.lock = threading.Lock()
+        self.assignment_id = None
+        self.pdfs = []
+
+    def post(self, path, body, content_type, query=""):
+        request = urllib.request.Request(
+            self.base_url + path + query,
+            data=body,
+            headers={"Content-Type": content_type},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=600) as response:
+            return json.loads(response.read() or b"null")
+
+    def build_request(self, endpoint, i):
+        """
+        Returns (path, body, content type, query string) for the i-th request. Must be called in
+        request order from one thread, so the payloads depend only on the seed.
+        """
+        boundary = f"{self.rng.getrandbits(128):032x}"
+        if endpoint == "submit_assignment":
+            pdf = self.rng.choice(self.pdfs)
+            if not self.repeat_submissions:
+                # Trailing bytes after %%EOF make every submission unique without changing its text,
+                # so the grading memo does not short-circuit the measurement
+                pdf += f"\n% loadtest submission {i}\n".encode()
+            return ENDPOINT_PATHS[endpoint], *encode_multipart(
+                fields={"assignment_id": self.assignment_id},
+                files=[("assignment_pdf", f"student_{i}.pdf", pdf)],
+                boundary=boundary,
+            ), ""
+        if endpoint == "create_assignment":
+            return ENDPOINT_PATHS[endpoint], *encode_multipart(
+                files=[
+                    ("question_pdf", f"question_{i}.pdf", self.pdfs[0]),
+                    ("key_pdf", f"key_{i}.pdf", self.pdfs[1]),
+                ],
+                boundary=boundary,
+            ), "?technical=true&total_marks=100"
+        files = [("files", f"plagiarism_{i}_{n}.pdf", pdf) for n, pdf in enumerate(self.rng.sample(self.pdfs, 3))]
+        return ENDPOINT_PATHS[endpoint], *encode_multipart(files=files, boundary=boundary), ""
+
+    def setup(self):
+        """Generates the synthetic PDFs and creates the assignment that submissions are graded against."""
+        key_text = synthetic_text(self.rng, self.words)
+        self.pdfs = [synthetic_pdf(synthetic_text(self.rng, self.words // 4)), synthetic_pdf(key_text)]
+        for _ in range(8):
+            # Submissions share part of the key so every metric has something to match
+            shared = key_text[:self.rng.randint(0, len(key_text))]
+            self.pdfs.append(synthetic_pdf(shared + " " + synthetic_text(self.rng, self.words // 2)))
+        path, body, content_type, query = self.build_request("create_assignment", "setup")
+        self.assignment_id = self.post(path, body, content_type, query)["assignment_id"]
+
+    def sample_memory(self, stop, peak):
+        while not stop.is_set():
+            rss = process_tree_rss_mb(self.server_pid)
+            if rss is not None:
+                peak[0] = max(peak[0] or 0, rss)
+            stop.wait(0.05)
+
+    def send(self, endpoint, request, latencies, errors):
+        path, body, content_type, query = request
+        start = time.perf_counter()
+        failed = False
+        try:
+            self.post(path, body, content_type, query)
+        except Exception:
+            # Any failure, including http.client errors such as IncompleteRead, counts against the endpoint
+            failed = True
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            if failed:
+                errors[endpoint] += 1
+            else:
+                latencies[endpoint].append(elapsed)
+
+    def run_phase(self, schedule, first_index=0):
+        """Sends the scheduled requests and returns per-endpoint statistics and the server's peak RSS."""
+        names = sorted(set(schedule))
+        requests = [self.build_request(endpoint, i) for i, endpoint in enumerate(schedule, first_index)]
+        latencies = {name: [] for name in names}
+        errors = {name: 0 for name in names}
+
+        # Memory the server already holds is reported too, since earlier phases may have grown it
+        start_rss = process_tree_rss_mb(self.server_pid) if self.server_pid is not None else None
+        stop = threading.Event()
+        peak = [start_rss]
+        sampler = None
+        if self.server_pid is not None:
+            sampler = threading.Thread(target=self.sample_memory, args=(stop, peak), daemon=True)
+            sampler.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [
+                pool.submit(self.send, endpoint, request, latencies, errors)
+                for endpoint, request in zip(schedule, requests)
+            ]
+            for future in futures:
+                future.result()
+        duration = time.perf_counter() - start
+        stop.set()
+        if sampler is not None:
+            sampler.join()
+
+        endpoints = {}
+        for name in names:
+            values = sorted(latencies[name])
+            total = len(values) + errors[name]
+            endpoints[ENDPOINT_PATHS[name]] = {
+                "requests": total,
+                "errors": errors[name],
+                "error_rate": round(errors[name] / total, 4) if total else 0,
+                "throughput_rps": round(len(values) / duration, 3),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1) if values else None,
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1) if values else None,
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1) if values else None,
+            }
+        return {
+            "duration_s": round(duration, 3),
+            "throughput_rps": round(sum(len(v) for v in latencies.values()) / duration, 3),
+            "server_start_rss_mb": round(start_rss, 1) if start_rss is not None else None,
+            "server_peak_rss_mb": round(peak[0], 1) if peak[0] is not None else None,
+            "endpoints": endpoints,
+        }
+
+    def run(self):
+        """Runs the mixed phase and then one phase per endpoint, and returns the report dictionary."""
+        self.setup()
+        names = list(self.mix)
+        schedule = self.rng.choices(names, weights=[self.mix[name] for name in names], k=self.requests)
+        report = {
+            "config": {
+                "base_url": self.base_url,
+                "requests": self.requests,
+                "phase_requests": self.phase_requests,
+                "concurrency": self.concurrency,
+                "mix": self.mix,
+                "words_per_key": self.words,
+                "server_rss_measured": self.server_pid is not None,
+                "repeat_submissions": self.repeat_submissions,
+            },
+            "mixed": self.run_phase(schedule),
+            "phases": {},
+        }
+        first_index = self.requests
+        for name in names:
+            report["phases"][ENDPOINT_PATHS[name]] = self.run_phase([name] * self.phase_requests, first_index)
+            first_index += self.phase_requests
+        return report
+
+
+# Function to start the FastAPI app on localhost in a subprocess
+def start_local_server(port, workers):
+    """
+    Runs main.app under uvicorn in a child process and returns it once it accepts connections.
+    Its pid (plus any worker processes) is what peak RSS is measured on.
+    """
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start within 120 seconds")
+
+
+# Function to render the report as HTML
+def render_html(report):
+    """
+    Returns a standalone HTML page with a table for the mixed phase and one for the per-endpoint phases.
+    """
+    columns = ["requests", "errors", "error_rate", "throughput_rps", "p50_ms", "p95_ms", "p99_ms"]
+    header = "".join(f"<th>{c}</th>" for c in ["endpoint"] + columns)
+
+    def row(path, stats, extra=""):
+        return "<tr><td>{}</td>{}{}</tr>".format(path, "".join(f"<td>{stats[c]}</td>" for c in columns), extra)
+
+    mixed = report["mixed"]
+    mixed_rows = "".join(row(path, stats) for path, stats in mixed["endpoints"].items())
+    phase_rows = "".join(
+        row(path, phase["endpoints"][path], f"<td>{phase['server_start_rss_mb']}</td><td>{phase['server_peak_rss_mb']}</td>")
+        for path, phase in report["phases"].items()
+    )
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Load Test Report</title>"
+        "<style>table{border-collapse:collapse}td,th{border:1px solid #999;padding:4px 8px;text-align:right}</style>"
+        "</head><body><h1>Load Test Report</h1>"
+        f"<pre>{json.dumps(report['config'], indent=2)}</pre>"
+        "<h2>Mixed traffic</h2>"
+        f"<p>Duration: {mixed['duration_s']} s, throughput: {mixed['throughput_rps']} req/s, "
+        f"server peak RSS: {mixed['server_peak_rss_mb']} MB</p>"
+        f"<table><tr>{header}</tr>{mixed_rows}</table>"
+        "<h2>Single-endpoint phases</h2>"
+        f"<table><tr>{header}<th>server_start_rss_mb</th><th>server_peak_rss_mb</th></tr>{phase_rows}</table></body></html>"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the grading API")
+    parser.add_argument("--url", help="Target an already running server instead of starting main.app locally")
+    parser.add_argument("--server-pid", type=int, help="Pid of the server given with --url, for RSS sampling")
+    parser.add_argument("--port", type=int, default=9100, help="Port for the local server")
+    parser.add_argument("--workers", type=int, default=1, help="Number of uvicorn workers for the local server")
+    parser.add_argument("--requests", type=int, default=200, help="Number of requests in the mixed phase")
+    parser.add_argument("--phase-requests", type=int, default=50, help="Number of requests in each single-endpoint phase")
+    parser.add_argument("--concurrency", type=int, default=10, help="Number of concurrent clients")
+    parser.add_argument("--mix", type=json.loads, default=DEFAULT_MIX,
+                        help='Traffic mix as JSON, e.g. \'{"submit_assignment": 0.9, "check_plagiarism": 0.1}\'')
+    parser.add_argument("--words", type=int, default=400, help="Length of the synthetic key in words")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat-submissions", action="store_true",
+                        help="Resend byte-identical submission PDFs so repeats are served from the grading memo")
+    parser.add_argument("--output", default="loadtest_report", help="Report path without extension")
+    args = parser.parse_args()
+
+    unknown = set(args.mix) - set(ENDPOINT_PATHS)
+    if unknown:
+        parser.error(f"Unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+
+    server = None
+    base_url = args.url
+    server_pid = args.server_pid
+    if base_url is None:
+        server = start_local_server(args.port, args.workers)
+        base_url = f"http://127.0.0.1:{args.port}"
+        server_pid = server.pid
+    elif server_pid is None:
+        print("No --server-pid given: server memory will not be reported.")
+
+    try:
+        report = LoadTest(
+            base_url, args.mix, args.requests, args.phase_requests, args.concurrency,
+            args.words, args.seed, server_pid, args.repeat_submissions,
+        ).run()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    report["config"]["workers"] = args.workers if args.url is None else None
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output + ".json", "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    with open(args.output + ".html", "w") as f:
+        f.write(render_html(report))
+
+    for path, phase in report["phases"].items():
+        stats = phase["endpoints"][path]
+        print(f"{path}: p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, p99 {stats['p99_ms']} ms, "
+              f"errors {stats['error_rate']:.2%}, {stats['throughput_rps']} req/s, "
+              f"server peak RSS {phase['server_peak_rss_mb']} MB")
+    print(f"Report written to {args.output}.json and {args.output}.html")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
-from database import Base
+from database import Base, add_missing_column
 
 class Assignment(Base):
     __tablename__ = "assignments"
@@ -22,5 +22,9 @@ class Result(Base):
     assignment_id = Column(Integer, ForeignKey('assignments.id'))
     marks_obtained = Column(Integer)
     percentage = Column(Integer)
+    provisional = Column(Boolean, default=False)  # True until metrics skipped under a time budget are finalized
 
     assignment = relationship("Assignment")
+
+# Databases created before the provisional column existed get it added in place
+add_missing_column("results", "provisional", "BOOLEAN DEFAULT 0")
@@ -1,4 +1,6 @@
 import io
+import math
+from collections import defaultdict, deque
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from PyPDF2 import PdfReader
@@ -50,12 +52,16 @@ def remove_boilerplate(text, boilerplate_phrases=None):
 
 
 # Function to check plagiarism using TF-IDF and Cosine Similarity
-def check_plagiarism(file_texts):
+def check_plagiarism(file_texts, file_names=None):
     """
     Compares text from multiple files using TF-IDF and cosine similarity.
+    Files are labelled with file_names when given, otherwise File_1, File_2, ... in input order.
     Returns a sorted list of plagiarism reports with similarity above a threshold.
     """
-    non_empty_texts = [text for text in file_texts if text.strip()]
+    labels = file_names or [f"File_{i+1}" for i in range(len(file_texts))]
+    non_empty = [(label, text) for label, text in zip(labels, file_texts) if text.strip()]
+    non_empty_labels = [label for label, _ in non_empty]
+    non_empty_texts = [text for _, text in non_empty]
     if len(non_empty_texts) < len(file_texts):
         print("Warning: Some files are empty and will be excluded from plagiarism detection.")
     
@@ -69,8 +75,8 @@ def check_plagiarism(file_texts):
         for j in range(i + 1, len(non_empty_texts)):
             similarity = similarity_matrix[i][j]
             plagiarism_report.append({
-                "file_1": f"File_{i+1}",
-                "file_2": f"File_{j+1}",
+                "file_1": non_empty_labels[i],
+                "file_2": non_empty_labels[j],
                 "similarity": round(similarity * 100, 2)
             })
 
@@ -80,6 +86,186 @@ def check_plagiarism(file_texts):
 
 
 
+# Winnowing parameters: k-gram length and window size, both in characters.
+# Any shared passage of at least KGRAM_SIZE + WINDOW_SIZE - 1 characters is guaranteed to be detected.
+KGRAM_SIZE = 25
+WINDOW_SIZE = 20
+HASH_BASE = 257
+HASH_MODULUS = (1 << 61) - 1
+
+# Fingerprints shared by more files than this fraction of the corpus (and at least
+# MIN_FILE_FREQUENCY_CAP files) are treated as common phrasing, as MOSS does
+MAX_FILE_FREQUENCY_FRACTION = 0.1
+MIN_FILE_FREQUENCY_CAP = 10
+
+
+# Function to hash every k-gram of a text
+def kgram_hashes(text, k=KGRAM_SIZE):
+    """
+    Returns the Karp-Rabin rolling hash of every k-gram in the text, indexed by start offset.
+    """
+    if len(text) < k:
+        return []
+    high = pow(HASH_BASE, k - 1, HASH_MODULUS)
+    h = 0
+    for char in text[:k]:
+        h = (h * HASH_BASE + ord(char)) % HASH_MODULUS
+    hashes = [h]
+    for i in range(k, len(text)):
+        h = ((h - ord(text[i - k]) * high) * HASH_BASE + ord(text[i])) % HASH_MODULUS
+        hashes.append(h)
+    return hashes
+
+
+# Function to select fingerprints from k-gram hashes
+def winnow(hashes, window=WINDOW_SIZE):
+    """
+    Selects the rightmost minimal hash of every window of consecutive hashes.
+    Returns a list of (hash, offset) fingerprints, each recorded once.
+    """
+    fingerprints = []
+    if not hashes:
+        return fingerprints
+    window = min(window, len(hashes))
+    candidates = deque()  # Offsets whose hashes increase from left to right
+    last_selected = -1
+    for i, h in enumerate(hashes):
+        while candidates and hashes[candidates[-1]] >= h:
+            candidates.pop()
+        candidates.append(i)
+        if candidates[0] <= i - window:
+            candidates.popleft()
+        if i >= window - 1 and candidates[0] != last_selected:
+            last_selected = candidates[0]
+            fingerprints.append((hashes[last_selected], last_selected))
+    return fingerprints
+
+
+# Function to build an inverted fingerprint index
+def build_fingerprint_index(file_texts, exclude_text=None, k=KGRAM_SIZE, window=WINDOW_SIZE):
+    """
+    Maps each fingerprint hash to the list of (file index, offset) pairs where it was selected.
+    K-grams that also occur in exclude_text (e.g. the assignment's question PDF) are left out.
+    """
+    excluded = set(kgram_hashes(exclude_text, k)) if exclude_text else set()
+    index = defaultdict(list)
+    for file_index, text in enumerate(file_texts):
+        for h, offset in winnow(kgram_hashes(text, k), window):
+            if h not in excluded:
+                index[h].append((file_index, offset))
+    return index
+
+
+# Function to merge fingerprint matches into contiguous passages
+def merge_matches(matches, k=KGRAM_SIZE, window=WINDOW_SIZE):
+    """
+    Merges (offset_1, offset_2) matches between two files into passages.
+    A match extends the open passage within one window of it on both sides whose diagonal
+    (offset_2 - offset_1) is closest, so text repeated in one file yields one passage per copy.
+    """
+    passages = []
+    open_passages = []
+    for offset_1, offset_2 in sorted(matches):
+        # Passages more than a window behind this match can no longer be extended
+        open_passages = [p for p in open_passages if offset_1 <= p["file_1_end"] + window]
+        candidates = [
+            p for p in open_passages
+            if p["file_2_start"] <= offset_2 <= p["file_2_end"] + window
+        ]
+        if candidates:
+            diagonal = offset_2 - offset_1
+            passage = min(candidates, key=lambda p: abs(p["diagonal"] - diagonal))
+            passage["file_1_end"] = max(passage["file_1_end"], offset_1 + k)
+            passage["file_2_end"] = max(passage["file_2_end"], offset_2 + k)
+            passage["diagonal"] = diagonal
+            continue
+        passage = {
+            "file_1_start": offset_1,
+            "file_1_end": offset_1 + k,
+            "file_2_start": offset_2,
+            "file_2_end": offset_2 + k,
+            "diagonal": offset_2 - offset_1,
+        }
+        passages.append(passage)
+        open_passages.append(passage)
+    for passage in passages:
+        del passage["diagonal"]
+    return passages
+
+
+# Function to measure how much of a file is covered by passages
+def covered_characters(intervals):
+    """
+    Returns the length of the union of (start, end) intervals, so overlapping passages count once.
+    """
+    covered = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                covered += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        covered += current_end - current_start
+    return covered
+
+
+# Function to localize plagiarised passages using winnowing
+def check_plagiarism_passages(file_texts, question_text=None, max_file_frequency=None,
+                              k=KGRAM_SIZE, window=WINDOW_SIZE, file_names=None):
+    """
+    Finds matching passages between every pair of files using a winnowed fingerprint index.
+    Files are labelled as in check_plagiarism: with file_names when given, otherwise File_1, File_2, ...
+    Texts should already be passed through normalize_text and remove_boilerplate; offsets refer to those texts.
+    Passages that also appear in question_text are excluded. Fingerprints shared by more than
+    max_file_frequency files, or occurring more than twice that many times in total, are treated
+    as common phrasing and ignored; this bounds the pairs per fingerprint so the cost stays
+    near-linear in the corpus size.
+    Returns a list of plagiarism reports sorted by the number of file_1 characters covered by passages.
+
+    A paragraph copied twice into another file is reported once per copy and counted once:
+
+    >>> paragraph = ("photosynthesis converts light energy into chemical energy stored in glucose, "
+    ...              "and the calvin cycle then fixes carbon.")
+    >>> report = check_plagiarism_passages([paragraph, paragraph + " " + paragraph])[0]
+    >>> len(report["passages"]), report["matched_characters"] <= len(paragraph)
+    (2, True)
+    """
+    if max_file_frequency is None:
+        max_file_frequency = max(MIN_FILE_FREQUENCY_CAP, math.ceil(MAX_FILE_FREQUENCY_FRACTION * len(file_texts)))
+    index = build_fingerprint_index(file_texts, question_text, k, window)
+
+    # Collect fingerprint matches per file pair; postings are in file order
+    pair_matches = defaultdict(list)
+    for postings in index.values():
+        files = {file_index for file_index, _ in postings}
+        if len(files) < 2 or len(files) > max_file_frequency or len(postings) > 2 * max_file_frequency:
+            continue
+        for position, (file_1, offset_1) in enumerate(postings):
+            for file_2, offset_2 in postings[position + 1:]:
+                if file_1 != file_2:
+                    pair_matches[(file_1, file_2)].append((offset_1, offset_2))
+
+    labels = file_names or [f"File_{i+1}" for i in range(len(file_texts))]
+    plagiarism_report = []
+    for (i, j), matches in pair_matches.items():
+        passages = merge_matches(matches, k, window)
+        for passage in passages:
+            passage["text"] = file_texts[i][passage["file_1_start"]:passage["file_1_end"]]
+        plagiarism_report.append({
+            "file_1": labels[i],
+            "file_2": labels[j],
+            "matched_characters": covered_characters((p["file_1_start"], p["file_1_end"]) for p in passages),
+            "passages": passages,
+        })
+
+    plagiarism_report.sort(key=lambda x: x["matched_characters"], reverse=True)
+    return plagiarism_report
+
+
+
 def main():
     print("Enhanced Plagiarism Checker")
     print("============================")
@@ -90,6 +276,7 @@ def main():
     for i in range(num_files):
         path = input(f"Enter path for file {i+1}: ")
         file_paths.append(path)
+    question_path = input("Enter path for the question PDF (leave blank to skip): ").strip()
 
     # Extract and preprocess text from the provided file paths
     file_texts = []
@@ -113,7 +300,12 @@ def main():
         return
 
     # Check plagiarism
-    results = check_plagiarism_tfidf(file_texts)
+    results = check_plagiarism(file_texts)
+    question_text = remove_boilerplate(normalize_text(extract_text_from_pdf(question_path))) if question_path else None
+    passage_reports = {
+        (report["file_1"], report["file_2"]): report["passages"]
+        for report in check_plagiarism_passages(file_texts, question_text)
+    }
 
     # Display results with a threshold
     threshold = 65  # Only show results with similarity above 65%
@@ -125,6 +317,11 @@ def main():
             print(
                 f"{result['file_1']} ↔ {result['file_2']} - {result['similarity']}% Similar"
             )
+            for passage in passage_reports.get((result["file_1"], result["file_2"]), []):
+                print(
+                    f"    [{passage['file_1_start']}:{passage['file_1_end']}] ↔ "
+                    f"[{passage['file_2_start']}:{passage['file_2_end']}] \"{passage['text']}\""
+                )
     else:
         print("No plagiarism detected above the threshold.")
 
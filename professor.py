@@ -1,10 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from sqlalchemy.orm import Session
 from database import get_db
-from pgc.pgc import check_plagiarism  # Ensure this is the correct path to your plagiarism checking module
+from models import Assignment
+from utils.file_processing import extract_text_from_pdf
+from pgc.pgc import check_plagiarism, check_plagiarism_passages, normalize_text, remove_boilerplate  # Ensure this is the correct path to your plagiarism checking module
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
 import os
-import shutil
-from typing import List
+import tempfile
+from typing import List, Optional
 
 router = APIRouter()
 
@@ -12,6 +19,96 @@ router = APIRouter()
 UPLOAD_FOLDER = "uploads/plagiarism"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Uploads are streamed to disk in chunks of this many bytes
+CHUNK_SIZE = 1024 * 1024
+
+# Bounded executors keep blocking work off the event loop: one for disk writes,
+# one for PDF extraction and similarity computation
+io_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("UPLOAD_IO_WORKERS", 4)))
+cpu_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("PLAGIARISM_WORKERS", 2)))
+
+def write_chunk(buffer, digest, chunk):
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+async def save_upload(upload: UploadFile, folder: str = UPLOAD_FOLDER):
+    """
+    Streams an upload to a temporary file while hashing it, then moves it to a path named after
+    its SHA-256 digest and returns that path. Identical uploads share one stored file; uploads
+    whose bytes differ never do, even when their file names match.
+    """
+    loop = asyncio.get_running_loop()
+    digest = hashlib.sha256()
+    extension = os.path.splitext(upload.filename or "")[1].lower() or ".pdf"
+    buffer = await loop.run_in_executor(
+        io_executor, functools.partial(tempfile.NamedTemporaryFile, dir=folder, suffix=".part", delete=False)
+    )
+    try:
+        while True:
+            chunk = await upload.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            await loop.run_in_executor(io_executor, write_chunk, buffer, digest, chunk)
+    except BaseException:
+        await loop.run_in_executor(io_executor, buffer.close)
+        await loop.run_in_executor(io_executor, os.remove, buffer.name)
+        raise
+    await loop.run_in_executor(io_executor, buffer.close)
+
+    # os.replace is atomic, and a concurrent upload with the same digest holds identical bytes
+    path = os.path.join(folder, digest.hexdigest() + extension)
+    await loop.run_in_executor(io_executor, os.replace, buffer.name, path)
+    return path
+
+
+def save_assignment(db: Session, assignment: Assignment):
+    """Adds and commits an assignment, rolling back on failure. Blocking; run in io_executor."""
+    try:
+        db.add(assignment)
+        db.commit()
+        db.refresh(assignment)
+    except Exception:
+        db.rollback()
+        raise
+
+
+def preprocess_pdf(path):
+    return remove_boilerplate(normalize_text(extract_text_from_pdf(path)))
+
+
+def upload_labels(files: List[UploadFile]):
+    """Labels uploads by file name, numbering repeated names so every upload stays distinguishable."""
+    seen = Counter()
+    labels = []
+    for file in files:
+        name = file.filename or "upload"
+        seen[name] += 1
+        labels.append(name if seen[name] == 1 else f"{name} ({seen[name]})")
+    return labels
+
+
+def extract_and_check_plagiarism(file_paths, file_names, question_pdf=None):
+    """
+    Extracts and preprocesses each PDF, then runs the similarity check and localizes matching passages,
+    excluding text from the question PDF. Files without extractable text are dropped once, before
+    either check, so both reports label the same uploads by name. Blocking; run in cpu_executor.
+    """
+    file_texts = [preprocess_pdf(path) for path in file_paths]
+    kept = [(name, text) for name, text in zip(file_names, file_texts) if text.strip()]
+    kept_names = [name for name, _ in kept]
+    kept_texts = [text for _, text in kept]
+    question_text = preprocess_pdf(question_pdf) if question_pdf else None
+    return {
+        "plagiarism_report": check_plagiarism(kept_texts, kept_names),
+        "passages": check_plagiarism_passages(kept_texts, question_text, file_names=kept_names),
+        "skipped_files": [name for name, text in zip(file_names, file_texts) if not text.strip()],
+    }
+
+
+def find_assignment(db: Session, assignment_id: int):
+    return db.query(Assignment).filter(Assignment.id == assignment_id).first()
+
 @router.post("/create_assignment", tags=["Professor"])
 async def create_assignment(
     question_pdf: UploadFile = File(...),
@@ -24,15 +121,11 @@ async def create_assignment(
 ):
     """Endpoint for creating an assignment with question and key PDFs."""
     try:
-        # Save the question PDF
-        question_pdf_path = os.path.join(UPLOAD_FOLDER, question_pdf.filename)
-        with open(question_pdf_path, "wb") as buffer:
-            shutil.copyfileobj(question_pdf.file, buffer)
-
-        # Save the key PDF
-        key_pdf_path = os.path.join(UPLOAD_FOLDER, key_pdf.filename)
-        with open(key_pdf_path, "wb") as buffer:
-            shutil.copyfileobj(key_pdf.file, buffer)
+        # Stream the question and key PDFs to disk concurrently
+        question_pdf_path, key_pdf_path = await asyncio.gather(
+            save_upload(question_pdf),
+            save_upload(key_pdf),
+        )
 
         # Save assignment details to the database
         new_assignment = Assignment(
@@ -43,8 +136,9 @@ async def create_assignment(
             spelling=spelling,
             total_marks=total_marks
         )
-        db.add(new_assignment)
-        db.commit()
+        # The Session is synchronous, so commit off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(io_executor, save_assignment, db, new_assignment)
 
         return {"message": "Assignment created successfully", "assignment_id": new_assignment.id}
 
@@ -55,21 +149,29 @@ async def create_assignment(
 @router.post("/check_plagiarism", tags=["Professor"])
 async def check_plagiarism_endpoint(
     files: List[UploadFile] = File(...),
+    assignment_id: Optional[int] = None,
+    db: Session = Depends(get_db),
 ):
-    """Endpoint to check plagiarism among selected files."""
-    file_paths = []
+    """
+    Endpoint to check plagiarism among selected files.
+    When assignment_id is given, passages copied from that assignment's question PDF are not reported.
+    """
+    loop = asyncio.get_running_loop()
+    question_pdf = None
+    if assignment_id is not None:
+        assignment = await loop.run_in_executor(io_executor, find_assignment, db, assignment_id)
+        if not assignment:
+            raise HTTPException(status_code=404, detail="Assignment ID not found")
+        question_pdf = assignment.question_pdf
 
     try:
         # Save each uploaded file to the uploads directory
-        for file in files:
-            file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            file_paths.append(file_path)
-
-        # Run plagiarism check
-        plagiarism_report = check_plagiarism(file_paths)  # Adjust function to handle multiple file paths
-        return {"plagiarism_report": plagiarism_report}
+        file_paths = await asyncio.gather(*(save_upload(file) for file in files))
+
+        # Run text extraction and the plagiarism checks off the event loop
+        return await loop.run_in_executor(
+            cpu_executor, extract_and_check_plagiarism, list(file_paths), upload_labels(files), question_pdf
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during plagiarism check: {e}")
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends
-from utils.file_processing import extract_text_from_pdf
-from utils.grading import grade_assignment
+from fastapi import APIRouter, UploadFile, File, Form, Depends, BackgroundTasks, HTTPException
+from utils.file_processing import extract_text_from_pdf, iter_pdf_pages, pdf_page_count
+from utils.grading import grade_assignment, grade_assignment_progressive, grade_assignment_streaming, finalize_grade, STREAMING_PAGE_THRESHOLD, WEIGHT_PROFILES, MODEL_VERSION
+from utils.grading_cache import grading_memo, file_hash
+from utils.lexical import get_lexical_model
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, SessionLocal
 from models import Assignment, Result
+from typing import Optional
 import shutil
 import os
+import time
 
 router = APIRouter()
 
@@ -14,25 +18,59 @@ UPLOAD_FOLDER = "uploads/student_submissions"
 # Ensure the folder exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+def finalize_result(result_id, scores, student_text, key_text, total_marks, x, lexical_model, memo_args):
+    """
+    Computes the metrics skipped under the time budget and stores the final marks.
+    The result stays provisional if anything fails, so it is never reported as final by mistake.
+    """
+    marks_obtained = finalize_grade(scores, student_text, key_text, total_marks, x, lexical_model)
+    percentage = (marks_obtained / total_marks) * 100
+
+    db = SessionLocal()
+    try:
+        result = db.query(Result).filter(Result.id == result_id).first()
+        result.marks_obtained = marks_obtained
+        result.percentage = percentage
+        result.provisional = False
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    grading_memo.put(*memo_args, {
+        "result_id": result_id,
+        "marks_obtained": marks_obtained,
+        "percentage": percentage,
+        "provisional": False,
+    })
+
+
 @router.post("/submit_assignment", tags=["Student"])
 def submit_assignment(
+    background_tasks: BackgroundTasks,
     assignment_pdf: UploadFile = File(...),
     assignment_id: int = Form(...),
+    time_budget_ms: Optional[int] = Form(None),
     db: Session = Depends(get_db)
 ):
+    """
+    Grades a submission. With time_budget_ms, metrics that do not fit the budget are skipped and
+    finished in the background. Submissions over STREAMING_PAGE_THRESHOLD pages are streamed without
+    a deadline; the response then reports time_budget_applied = false.
+    """
+    started = time.monotonic()
+
     # Save the student's assignment PDF to the system
     assignment_pdf_path = os.path.join(UPLOAD_FOLDER, assignment_pdf.filename)
     
     with open(assignment_pdf_path, "wb") as buffer:
         shutil.copyfileobj(assignment_pdf.file, buffer)
     
-    # Extract text from the student's assignment PDF
-    student_text = extract_text_from_pdf(assignment_pdf_path)
-    
     # Retrieve the corresponding key PDF for the assignment from the database
     assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
     print(assignment)
-    key_text = extract_text_from_pdf(assignment.key_pdf)
     
     technical = assignment.technical
     grammar = assignment.grammar
@@ -56,7 +94,41 @@ def submit_assignment(
     else:
         x = 1
     
-    marks_obtained = grade_assignment(student_text, key_text, assignment.total_marks, x)
+    streaming = pdf_page_count(assignment_pdf_path) > STREAMING_PAGE_THRESHOLD
+    
+    # Return the stored grade if this exact submission was already graded against the same key and weights.
+    # The memo holds only the grade; fields that depend on this request are added to the copy.
+    submission_hash = file_hash(assignment_pdf_path)
+    key_hash = file_hash(assignment.key_pdf)
+    memo_args = (submission_hash, assignment_id, key_hash, WEIGHT_PROFILES[x], MODEL_VERSION)
+    cached = grading_memo.get(*memo_args)
+    if cached is not None:
+        response = dict(cached)
+        if time_budget_ms is not None:
+            response["time_budget_applied"] = not streaming
+        return response
+    
+    # Extract text from the key PDF
+    key_text = extract_text_from_pdf(assignment.key_pdf)
+    lexical_model = get_lexical_model(assignment_id, key_text, key_hash)
+    
+    if streaming:
+        # Large submissions are streamed page by page instead of being extracted whole.
+        # The streaming grader has no deadline, so time_budget_ms is not applied here.
+        marks_obtained = grade_assignment_streaming(
+            iter_pdf_pages(assignment_pdf_path), key_text, assignment.total_marks, x, lexical_model
+        )
+        grade = {"provisional": False}
+    elif time_budget_ms is None:
+        student_text = extract_text_from_pdf(assignment_pdf_path)
+        marks_obtained = grade_assignment(student_text, key_text, assignment.total_marks, x, lexical_model)
+        grade = {"provisional": False}
+    else:
+        # Grade what fits in the time budget; skipped metrics are finished after the response is sent
+        student_text = extract_text_from_pdf(assignment_pdf_path)
+        deadline = started + time_budget_ms / 1000
+        grade = grade_assignment_progressive(student_text, key_text, assignment.total_marks, x, lexical_model, deadline)
+        marks_obtained = grade["marks_obtained"]
     percentage = (marks_obtained / assignment.total_marks) * 100
     
     # Save the result in the database
@@ -64,9 +136,42 @@ def submit_assignment(
         student_id=1,  # Student ID would be dynamic in a real app
         assignment_id=assignment_id,
         marks_obtained=marks_obtained,
-        percentage=percentage
+        percentage=percentage,
+        provisional=grade["provisional"]
     )
     db.add(new_result)
     db.commit()
     
-    return {"marks_obtained": marks_obtained, "percentage": percentage}
+    result = {
+        "result_id": new_result.id,
+        "marks_obtained": marks_obtained,
+        "percentage": percentage,
+        "provisional": grade["provisional"],
+    }
+    if not grade["provisional"]:
+        grading_memo.put(*memo_args, result)
+    
+    response = dict(result)
+    if time_budget_ms is not None:
+        response["time_budget_applied"] = not streaming
+    if grade["provisional"]:
+        response["skipped"] = grade["skipped"]
+        background_tasks.add_task(
+            finalize_result, new_result.id, grade["scores"], student_text, key_text,
+            assignment.total_marks, x, lexical_model, memo_args,
+        )
+    return response
+
+
+@router.get("/result/{result_id}", tags=["Student"])
+def get_result(result_id: int, db: Session = Depends(get_db)):
+    """Returns a stored result; provisional is true while skipped metrics are still being finalized."""
+    result = db.query(Result).filter(Result.id == result_id).first()
+    if not result:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return {
+        "result_id": result.id,
+        "marks_obtained": result.marks_obtained,
+        "percentage": result.percentage,
+        "provisional": bool(result.provisional),
+    }